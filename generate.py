@@ -1,55 +1,104 @@
 import os
-import json
+import re
+import orjson
 import random
 import asyncio
-import telegram
 from telegram import Update
 from telegram.ext import (
-    ApplicationBuilder, CommandHandler, MessageHandler,
+    AIORateLimiter, ApplicationBuilder, CommandHandler, MessageHandler,
     ContextTypes, filters
 )
 
 # === CONFIG ===
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # e.g. https://example.com/bot — empty means long polling
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 DEFAULT_FILENAME = "idioms.json"
 BOT_USERNAME = None  # Will be set at startup
 
-# === Load idioms ===
+# === MarkdownV2 escaping (same char set as telegram.helpers.escape_markdown
+# version=2) — translate-table fast path for ASCII text, regex otherwise ===
+_MDV2 = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+_MDV2_TABLE = str.maketrans({c: "\\" + c for c in "_*[]()~`>#+-=|{}.!\\"})
+
+def escape_markdown_v2(text: str) -> str:
+    if text.isascii():
+        return text.translate(_MDV2_TABLE)
+    return _MDV2.sub(r"\\\1", text)
+
+# === Load idioms (cached in memory, re-read only when the file changes) ===
+_IDIOMS_CACHE = {}  # filename -> {"mtime": float, "data": list}
+
 def load_idioms(filename=DEFAULT_FILENAME):
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            return json.load(f)
+        mtime = os.stat(filename).st_mtime
+        cached = _IDIOMS_CACHE.get(filename)
+        if cached and cached["mtime"] == mtime:
+            return cached["data"]
+
+        with open(filename, "rb") as f:
+            idioms = orjson.loads(f.read())
     except Exception as e:
         print("❌ Failed to load idioms:", e)
         return []
 
+    # Escape and format each idiom once at load time, so /start only
+    # has to prepend the numbered header per message.
+    for item in idioms:
+        parts = [
+            f"*{escape_markdown_v2(item['phrase'])}*",
+            "",
+            f"💡 *Meaning:* _{escape_markdown_v2(item['interpretation'])}_",
+            "",
+            "🧾 *Examples:*",
+        ]
+        for i, ex in enumerate(item.get("examples", []), 1):
+            parts.append(f"   ➤ _Example {i}:_ {escape_markdown_v2(ex)}")
+
+        item["text_template"] = "\n".join(parts)
+
+    _IDIOMS_CACHE[filename] = {"mtime": mtime, "data": idioms}
+    return idioms
+
 # === Format idiom with MarkdownV2 ===
-def format_idiom(item: dict, index: int) -> str:
-    phrase = f"*{telegram.helpers.escape_markdown(item['phrase'], version=2)}*"
-    interpretation = f"💡 *Meaning:* _{telegram.helpers.escape_markdown(item['interpretation'], version=2)}_"
+_IDIOM_HEADERS = [f"🔹 *Idiom {i}*" for i in range(1, 101)]
 
-    example_lines = ["🧾 *Examples:*"]
-    for i, ex in enumerate(item.get("examples", []), 1):
-        example_lines.append(f"   ➤ _Example {i}:_ {telegram.helpers.escape_markdown(ex, version=2)}")
+def format_idiom(item: dict, index: int) -> str:
+    if index <= len(_IDIOM_HEADERS):
+        header = _IDIOM_HEADERS[index - 1]
+    else:
+        header = f"🔹 *Idiom {index}*"
+    return f"{header}\n\n{item['text_template']}"
 
-    return f"🔹 *Idiom {index}*\n\n{phrase}\n\n{interpretation}\n\n" + "\n".join(example_lines)
+# === Send idioms with pinning, rate-limited but concurrent ===
+SEND_CONCURRENCY = 5  # in-flight send+pin pairs at once
 
-# === Send idioms with pinning & delay ===
 async def send_idioms(bot, chat_id, thread_id, idioms):
-    for i, idiom in enumerate(idioms, 1):
-        msg_text = format_idiom(idiom, i)
-
-        # Send message in the right topic/thread
-        msg = await bot.send_message(
-            chat_id=chat_id,
-            text=msg_text,
-            message_thread_id=thread_id,
-            parse_mode="MarkdownV2"
-        )
-
-        await asyncio.sleep(1.5)
-        await bot.pin_chat_message(chat_id=chat_id, message_id=msg.message_id, disable_notification=True)
-        await asyncio.sleep(1.5)
+    semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+    pin_tasks = []
+
+    async def send_one(index, idiom):
+        msg_text = format_idiom(idiom, index)
+
+        async with semaphore:
+            # Send message in the right topic/thread; pacing is handled
+            # by the application's AIORateLimiter.
+            msg = await bot.send_message(
+                chat_id=chat_id,
+                text=msg_text,
+                message_thread_id=thread_id,
+                parse_mode="MarkdownV2"
+            )
+
+        # Pinning doesn't need to hold up the next send — run it in the
+        # background and settle all pins before returning.
+        pin_tasks.append(asyncio.create_task(
+            bot.pin_chat_message(chat_id=chat_id, message_id=msg.message_id, disable_notification=True)
+        ))
+
+    await asyncio.gather(*(send_one(i, idiom) for i, idiom in enumerate(idioms, 1)))
+    await asyncio.gather(*pin_tasks)
 
 # === /start Handler ===
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -96,7 +145,12 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 if __name__ == "__main__":
     print("🤖 Bot running...")
 
-    app = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .rate_limiter(AIORateLimiter(overall_max_rate=30, overall_time_period=1, max_retries=3))
+        .build()
+    )
 
     async def startup(app):  # ✅ Accept the app instance
         global BOT_USERNAME
@@ -108,6 +162,18 @@ if __name__ == "__main__":
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
     app.post_init = startup  # ✅ Correct usage
-    app.run_polling()
+
+    if WEBHOOK_URL:
+        # Webhook mode: Telegram fans updates out as concurrent HTTPS
+        # POSTs instead of the serial getUpdates long-poll.
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=WEBHOOK_PORT,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=100,
+        )
+    else:
+        app.run_polling()
 
 